@@ -6,7 +6,10 @@ import time
 import requests
 import random
 import os
+import re
 import copy
+import bisect
+import itertools
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -20,26 +23,41 @@ API_KEY = os.getenv('ANTHROPIC_API_KEY')
 GOOGLE_CLOUD_PROJECT = os.getenv('GOOGLE_CLOUD_PROJECT')
 GOOGLE_CLOUD_REGION = os.getenv('GOOGLE_CLOUD_REGION', 'us-east5')
 
-# Initialize Anthropic client based on environment
-if GOOGLE_CLOUD_PROJECT:
-    from anthropic import AnthropicVertex
-    anthropic_client = AnthropicVertex(
-        project_id=GOOGLE_CLOUD_PROJECT,
-        region=GOOGLE_CLOUD_REGION
-    )
-else:
-    from anthropic import Anthropic
-    anthropic_client = Anthropic(api_key=API_KEY)
+# Anthropic client, created on first use so that importing this module
+# (e.g. from batch.py) does not need credentials
+anthropic_client = None
+
+def get_anthropic_client():
+    """Initialize Anthropic client based on environment"""
+    global anthropic_client
+    if anthropic_client is None:
+        if GOOGLE_CLOUD_PROJECT:
+            from anthropic import AnthropicVertex
+            anthropic_client = AnthropicVertex(
+                project_id=GOOGLE_CLOUD_PROJECT,
+                region=GOOGLE_CLOUD_REGION
+            )
+        else:
+            from anthropic import Anthropic
+            anthropic_client = Anthropic(api_key=API_KEY)
+    return anthropic_client
 
 # Session storage: dictionary keyed by session ID
 sessions = {}
 
+# Model settings shared by interactive and batch requests
+MODEL = "claude-sonnet-4-5"
+MAX_TOKENS = 1024
+
+# Propositions judged above this worth are added to the text
+WORTH_THRESHOLD = 40
+
 def query_claude(prompt):
     """Query Claude API with a prompt (works with both Anthropic and Vertex AI)"""
     try:
-        message = anthropic_client.messages.create(
-            model="claude-sonnet-4-5",
-            max_tokens=1024,
+        message = get_anthropic_client().messages.create(
+            model=MODEL,
+            max_tokens=MAX_TOKENS,
             messages=[
                 {"role": "user", "content": prompt}
             ]
@@ -49,26 +67,157 @@ def query_claude(prompt):
         print(f"Claude API Exception: {str(e)}")
         return None
 
-def sort_by_identifier(item):
-    """Sort key function for identifiers"""
-    identifier = item['identifier']
+def identifier_key(identifier):
+    """Sort key for a bare identifier string"""
     # Split by dots and convert to integers for proper numeric sorting
     parts = identifier.split('.')
     result = []
     for part in parts:
-        if part.isdigit():
-            result.append(int(part))
-        else:
-            # For non-numeric parts, keep as string
-            result.append(part)
+        # Split off a non-numeric suffix (e.g. the "a" added when de-duplicating),
+        # so that "2.02a" sorts right after "2.02" and keys stay comparable
+        prefix, suffix = re.match(r'(\d*)(.*)', part).groups()
+        result.append((int(prefix) if prefix else -1, suffix))
     return tuple(result)
 
-def format_storage_as_md(storage):
-    """Format storage items as markdown"""
-    markdown = ""
-    for item in sorted(storage, key=sort_by_identifier):
-        markdown += f"- **{item['identifier']}**: {item['content']}\n"
-    return markdown
+def sort_by_identifier(item):
+    """Sort key function for identifiers"""
+    return identifier_key(item['identifier'])
+
+def render_line(item):
+    """Render a single proposition as a markdown list entry"""
+    return f"- **{item['identifier']}**: {item['content']}\n"
+
+class Corpus:
+    """Immutable, sorted snapshot of a session's propositions.
+
+    Every change produces a new Corpus that shares the unchanged proposition
+    dicts with the previous one, so readers can hold on to a snapshot without
+    copying or locking. Propositions must be treated as read-only; replace
+    them with with_replaced() instead of mutating them.
+
+    The rendered markdown line of each proposition is carried over between
+    versions, so a change only renders the lines it touches. The joined text
+    is built once per version, on first use.
+    """
+
+    __slots__ = ('items', 'keys', 'lines', '_text', '_offsets')
+
+    def __init__(self, items=(), keys=None, lines=None):
+        if keys is None:
+            items = tuple(sorted(items, key=sort_by_identifier))
+            keys = tuple(sort_by_identifier(item) for item in items)
+        if lines is None:
+            lines = tuple(render_line(item) for item in items)
+        self.items = items
+        self.keys = keys
+        self.lines = lines
+        self._text = None
+        self._offsets = None
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    def insertion_index(self, identifier):
+        """Position at which a proposition with this identifier would be sorted"""
+        return bisect.bisect_right(self.keys, identifier_key(identifier))
+
+    def with_item(self, item):
+        """Return a new version with item inserted at its sorted position"""
+        index = self.insertion_index(item['identifier'])
+        key = sort_by_identifier(item)
+        return Corpus(self.items[:index] + (item,) + self.items[index:],
+                      self.keys[:index] + (key,) + self.keys[index:],
+                      self.lines[:index] + (render_line(item),) + self.lines[index:])
+
+    def without(self, index):
+        """Return a new version with the item at index removed"""
+        return Corpus(self.items[:index] + self.items[index + 1:],
+                      self.keys[:index] + self.keys[index + 1:],
+                      self.lines[:index] + self.lines[index + 1:])
+
+    def with_replaced(self, index, item):
+        """Return a new version with the item at index replaced (and re-sorted)"""
+        return self.without(index).with_item(item)
+
+    def text(self):
+        """Markdown rendering of this version"""
+        if self._text is None:
+            self._text = "".join(self.lines)
+        return self._text
+
+    def text_with(self, candidate):
+        """Markdown rendering with candidate spliced in at its sorted position"""
+        offsets = self._offsets
+        if offsets is None:
+            # Character offset at which each line starts, plus the end.
+            # Only publish the list once it is complete, other threads may
+            # be reading the same version.
+            offsets = [0]
+            offsets.extend(itertools.accumulate(len(line) for line in self.lines))
+            self._offsets = offsets
+        offset = offsets[self.insertion_index(candidate['identifier'])]
+        text = self.text()
+        return text[:offset] + render_line(candidate) + text[offset:]
+
+def format_storage_as_md(storage, candidate=None):
+    """Format storage items as markdown, optionally slotting in a candidate"""
+    if candidate is None:
+        return storage.text()
+    return storage.text_with(candidate)
+
+def build_synthesize_prompt(storage, p1, p2):
+    """Prompt asking for a new proposition relating p1 and p2"""
+    prompt_text = "Here is a philosophical text:\n" + format_storage_as_md(storage)
+    prompt_text += f"\n\nThink about how propositions {p1} and {p2} relate. Then write a new proposition about this. Try to match the original style. Present a novel idea that does not stray too far from the text. Respond with ONLY the text. Do not give it a number yet, that comes later.\n\nText:"
+    return prompt_text
+
+def build_number_prompt(storage, new_prop):
+    """Prompt asking for an identifier for new_prop"""
+    prompt_text = "Here is a philosophical text:\n" + format_storage_as_md(storage)
+    prompt_text += f'\n\nOne of my students suggests to add "{new_prop}". Assign a number to this proposition such that it fits well within the existing text. Respond with ONLY the number. Do not format the number as bold.\n\nNumber:'
+    return prompt_text
+
+def build_judge_prompt(storage, identifier, content):
+    """Prompt asking for a grade of the proposition slotted into the text"""
+    # Show the snapshot with the new proposition slotted in
+    candidate = {
+        'identifier': identifier,
+        'content': content,
+        'worth': 50  # temporary
+    }
+
+    prompt_text = "Here is a philosophical text:\n" + format_storage_as_md(storage, candidate)
+    prompt_text += f'\n\nIn this context, think about proposition {identifier}. Assign it a grade from 1 to 7, where 1 is worst and 7 is best, based on whether the proposition is coherent, meaningful and adds something to the text.\n1 means you believe the proposition is wrong and should be removed from the text.\n2 means the proposition is correct, but not meaningful and does not add anything to the text.\n3 means you believe it is a fruitful proposition for further thinking, but not particularly interesting.\n4 means it is moderately interesting and fruitful.\n5 means it is very fruitful and interesting.\n6 means it is an incredibly using proposition that warrants much more further thought.\n7 means it is extraordinarily interesting. Give this grade extremely sparingly.\nFirst give a reason, explaining any future ideas that you believe the proposition could lead to.\nThen respond with the ONLY the grade on its own line, do not add anything else to that line.'
+    return prompt_text
+
+def parse_worth(result, rng=random):
+    """Turn a judge response into a worth, falling back to 50"""
+    worth = 50  # default
+    if result:
+        try:
+            grade_line = result.strip().splitlines()[-1]
+            grade = int(grade_line)
+            worth = int(grade * 100 / 7) + rng.randrange(-5, 5)
+        except:
+            pass
+    return worth
+
+def make_unique_identifier(storage, identifier):
+    """Append a letter suffix to identifier if it is already taken"""
+    existing_ids = [item['identifier'] for item in storage]
+    if identifier in existing_ids:
+        # Find a unique identifier by appending letters
+        suffix_ord = ord('a')
+        while f"{identifier}{chr(suffix_ord)}" in existing_ids:
+            suffix_ord += 1
+        identifier = f"{identifier}{chr(suffix_ord)}"
+    return identifier
 
 # Storage options for the user to choose from
 STORAGE_OPTIONS = {
@@ -253,7 +402,8 @@ def init_session(storage_option=None):
             session['storage_option'] = 'empty'
 
         sessions[session_id] = {
-            'storage': initial_storage,
+            'storage': Corpus(initial_storage),
+            'storage_lock': threading.Lock(),  # Held by writers publishing a new corpus version
             'current_state': 'Stopped',
             'is_running': False,
             'state_thread': None,
@@ -329,10 +479,7 @@ async def synthesize(session_id):
     # Highlight both partners
     session_data['highlighted_ids'] = [p1, p2]
 
-    prompt_text = "Here is a philosophical text:\n" + format_storage_as_md(storage)
-    prompt_text += f"\n\nThink about how propositions {p1} and {p2} relate. Then write a new proposition about this. Try to match the original style. Present a novel idea that does not stray too far from the text. Respond with ONLY the text. Do not give it a number yet, that comes later.\n\nText:"
-
-    result = query_claude(prompt_text)
+    result = query_claude(build_synthesize_prompt(storage, p1, p2))
     if result:
         temp['new_proposition'] = result.strip()
 
@@ -362,10 +509,7 @@ async def number(session_id):
         'status': 'numbering'
     }
 
-    prompt_text = "Here is a philosophical text:\n" + format_storage_as_md(storage)
-    prompt_text += f'\n\nOne of my students suggests to add "{new_prop}". Assign a number to this proposition such that it fits well within the existing text. Respond with ONLY the number. Do not format the number as bold.\n\nNumber:'
-
-    result = query_claude(prompt_text)
+    result = query_claude(build_number_prompt(storage, new_prop))
     if result:
         temp['new_identifier'] = result.strip()
 
@@ -374,28 +518,7 @@ async def number(session_id):
 
 def judge_proposition_worth(storage, identifier, content):
     """Judge a proposition and return its worth"""
-    # Create a test version with the new proposition
-    test_storage = copy.deepcopy(storage)
-    test_storage.append({
-        'identifier': identifier,
-        'content': content,
-        'worth': 50  # temporary
-    })
-
-    prompt_text = "Here is a philosophical text:\n" + format_storage_as_md(test_storage)
-    prompt_text += f'\n\nIn this context, think about proposition {identifier}. Assign it a grade from 1 to 7, where 1 is worst and 7 is best, based on whether the proposition is coherent, meaningful and adds something to the text.\n1 means you believe the proposition is wrong and should be removed from the text.\n2 means the proposition is correct, but not meaningful and does not add anything to the text.\n3 means you believe it is a fruitful proposition for further thinking, but not particularly interesting.\n4 means it is moderately interesting and fruitful.\n5 means it is very fruitful and interesting.\n6 means it is an incredibly using proposition that warrants much more further thought.\n7 means it is extraordinarily interesting. Give this grade extremely sparingly.\nFirst give a reason, explaining any future ideas that you believe the proposition could lead to.\nThen respond with the ONLY the grade on its own line, do not add anything else to that line.'
-
-    worth = 50  # default
-    result = query_claude(prompt_text)
-    if result:
-        try:
-            grade_line = result.strip().splitlines()[-1]
-            grade = int(grade_line)
-            worth = int(grade * 100 / 7) + random.randrange(-5, 5)
-        except:
-            pass
-
-    return worth
+    return parse_worth(query_claude(build_judge_prompt(storage, identifier, content)))
 
 async def judge(session_id):
     """Judge the new proposition and decide whether to add it"""
@@ -413,13 +536,7 @@ async def judge(session_id):
         return "Finding partners"
 
     # Check for duplicate identifiers and append suffix if needed
-    existing_ids = [item['identifier'] for item in storage]
-    if new_id in existing_ids:
-        # Find a unique identifier by appending letters
-        suffix_ord = ord('a')
-        while f"{new_id}{chr(suffix_ord)}" in existing_ids:
-            suffix_ord += 1
-        new_id = f"{new_id}{chr(suffix_ord)}"
+    new_id = make_unique_identifier(storage, new_id)
 
     # Set status detail
     session_data['status_detail'] = "Evaluating the proposition's worth."
@@ -435,15 +552,18 @@ async def judge(session_id):
     worth = judge_proposition_worth(storage, new_id, new_prop)
 
     # Add if worth > threshold, otherwise mark as rejected
-    if worth > 40:
-        storage.append({
-            'identifier': new_id,
-            'content': new_prop,
-            'worth': worth,
-            'created_cycle': session_data['cycle_count']
-        })
-        # Reorder storage after adding
-        session_data['storage'] = sorted(storage, key=sort_by_identifier)
+    if worth > WORTH_THRESHOLD:
+        # Publish against the latest version so concurrent edits are kept
+        with session_data['storage_lock']:
+            # Another writer may have taken the identifier while judging
+            storage = session_data['storage']
+            new_id = make_unique_identifier(storage, new_id)
+            session_data['storage'] = storage.with_item({
+                'identifier': new_id,
+                'content': new_prop,
+                'worth': worth,
+                'created_cycle': session_data['cycle_count']
+            })
         # Clear highlighting after acceptance
         session_data['highlighted_ids'] = []
         session_data['draft_proposition'] = None
@@ -544,23 +664,26 @@ def select_storage():
 @app.route('/update', methods=['POST'])
 def update():
     session_data = get_session_data()
-    storage = session_data['storage']
 
     data = request.json
     index = data.get('index')
     identifier = data.get('identifier')
     content = data.get('content')
 
-    if index is not None and 0 <= index < len(storage):
-        storage[index]['identifier'] = identifier
-        storage[index]['content'] = content
+    with session_data['storage_lock']:
+        storage = session_data['storage']
+        if index is None or not 0 <= index < len(storage):
+            return jsonify({'error': 'Invalid index'}), 400
 
-        # Reorder storage after update
-        session_data['storage'] = sorted(storage, key=sort_by_identifier)
+        # Keep identifiers unique among the other propositions
+        if identifier != storage[index]['identifier']:
+            identifier = make_unique_identifier(storage.without(index), identifier)
 
-        return jsonify(storage[index])
+        # Replace rather than mutate, older snapshots may still be in use
+        updated_item = dict(storage[index], identifier=identifier, content=content)
+        session_data['storage'] = storage.with_replaced(index, updated_item)
 
-    return jsonify({'error': 'Invalid index'}), 400
+    return jsonify(updated_item)
 
 @app.route('/start', methods=['POST'])
 def start():
@@ -668,22 +791,25 @@ def get_status():
 @app.route('/get_items', methods=['GET'])
 def get_items():
     session_data = get_session_data()
-    sorted_items = sorted(session_data['storage'], key=sort_by_identifier)
-    return jsonify({'items': sorted_items})
+    # The corpus is kept sorted, so the snapshot can be returned as is
+    return jsonify({'items': list(session_data['storage'])})
 
 @app.route('/delete', methods=['POST'])
 def delete_proposition():
     session_data = get_session_data()
-    storage = session_data['storage']
 
     data = request.json
     index = data.get('index')
 
-    if index is not None and 0 <= index < len(storage):
-        deleted_item = storage.pop(index)
-        return jsonify({'status': 'deleted', 'item': deleted_item})
+    with session_data['storage_lock']:
+        storage = session_data['storage']
+        if index is None or not 0 <= index < len(storage):
+            return jsonify({'error': 'Invalid index'}), 400
 
-    return jsonify({'error': 'Invalid index'}), 400
+        deleted_item = storage[index]
+        session_data['storage'] = storage.without(index)
+
+    return jsonify({'status': 'deleted', 'item': deleted_item})
 
 @app.route('/add', methods=['POST'])
 def add_proposition():
@@ -698,31 +824,25 @@ def add_proposition():
         return jsonify({'error': 'Identifier and content are required'}), 400
 
     # Check for duplicate identifiers and append suffix if needed
-    existing_ids = [item['identifier'] for item in storage]
-    if identifier in existing_ids:
-        # Find a unique identifier by appending letters
-        suffix_ord = ord('a')
-        while f"{identifier}{chr(suffix_ord)}" in existing_ids:
-            suffix_ord += 1
-        identifier = f"{identifier}{chr(suffix_ord)}"
+    identifier = make_unique_identifier(storage, identifier)
 
     # Judge the proposition using Claude
     worth = judge_proposition_worth(storage, identifier, content)
 
-    new_item = {
-        'identifier': identifier,
-        'content': content,
-        'worth': worth,
-        'created_cycle': session_data.get('cycle_count', 0)
-    }
-
-    storage.append(new_item)
-
-    # Reorder storage after adding
-    session_data['storage'] = sorted(storage, key=sort_by_identifier)
+    with session_data['storage_lock']:
+        # Another writer may have taken the identifier while judging
+        storage = session_data['storage']
+        new_item = {
+            'identifier': make_unique_identifier(storage, identifier),
+            'content': content,
+            'worth': worth,
+            'created_cycle': session_data.get('cycle_count', 0)
+        }
+        storage = storage.with_item(new_item)
+        session_data['storage'] = storage
 
-    # Find the new index after sorting
-    new_index = next(i for i, item in enumerate(session_data['storage']) if item['identifier'] == identifier)
+    # Find the new index in the published version
+    new_index = next(i for i, item in enumerate(storage) if item is new_item)
 
     return jsonify({
         'item': new_item,
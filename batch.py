@@ -0,0 +1,210 @@
+"""Offline batch runs of The Automated Philosopher using the Message Batches API.
+
+Instead of one request at a time, every candidate of a run goes through the
+same three steps as the interactive state machine, but each step is sent as a
+single batch: all synthesize prompts, then all number prompts, then all judge
+prompts. Accepted propositions are added in candidate order, so a run is
+reproducible for a given seed and set of responses.
+
+Usage:
+    python batch.py tractatus --candidates 1000 --output tractatus.json
+    python batch.py tractatus --candidates 20 --fake   # fully offline
+"""
+import argparse
+import copy
+import json
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+from app import (
+    GOOGLE_CLOUD_PROJECT,
+    MAX_TOKENS,
+    MODEL,
+    STORAGE_OPTIONS,
+    WORTH_THRESHOLD,
+    Corpus,
+    build_judge_prompt,
+    build_number_prompt,
+    build_synthesize_prompt,
+    get_anthropic_client,
+    make_unique_identifier,
+    parse_worth,
+)
+
+def run_batch(client, prompts, poll_interval=30):
+    """Submit prompts (keyed by custom_id) as one batch and wait for the answers"""
+    if not prompts:
+        # The API rejects empty batches
+        return {}
+
+    batch = client.messages.batches.create(requests=[
+        {
+            "custom_id": custom_id,
+            "params": {
+                "model": MODEL,
+                "max_tokens": MAX_TOKENS,
+                "messages": [
+                    {"role": "user", "content": prompt}
+                ]
+            }
+        }
+        for custom_id, prompt in prompts.items()
+    ])
+
+    while batch.processing_status != "ended":
+        time.sleep(poll_interval)
+        batch = client.messages.batches.retrieve(batch.id)
+
+    results = {}
+    for entry in client.messages.batches.results(batch.id):
+        if entry.result.type == "succeeded":
+            results[entry.custom_id] = entry.result.message.content[0].text
+        else:
+            print(f"Batch request {entry.custom_id} {entry.result.type}", file=sys.stderr)
+    return results
+
+def generate(client, storage_option, candidate_count, seed=0, poll_interval=30):
+    """Generate and judge candidate_count propositions against a preset"""
+    rng = random.Random(seed)
+    storage = Corpus(copy.deepcopy(STORAGE_OPTIONS[storage_option]["data"]))
+
+    # Choose partners the same way finding_partners does
+    partner1 = max(storage, key=lambda x: x['worth'])
+    candidates = {}
+    for i in range(candidate_count):
+        candidates[f"candidate-{i}"] = {
+            'partner1': partner1['identifier'],
+            'partner2': rng.choice(storage.items)['identifier']
+        }
+
+    print(f"Synthesizing {len(candidates)} propositions", file=sys.stderr)
+    results = run_batch(client, {
+        custom_id: build_synthesize_prompt(storage, c['partner1'], c['partner2'])
+        for custom_id, c in candidates.items()
+    }, poll_interval)
+    for custom_id, text in results.items():
+        candidates[custom_id]['content'] = text.strip()
+    candidates = {k: c for k, c in candidates.items() if c.get('content')}
+
+    print(f"Numbering {len(candidates)} propositions", file=sys.stderr)
+    results = run_batch(client, {
+        custom_id: build_number_prompt(storage, c['content'])
+        for custom_id, c in candidates.items()
+    }, poll_interval)
+    for custom_id, text in results.items():
+        candidates[custom_id]['identifier'] = make_unique_identifier(storage, text.strip())
+    candidates = {k: c for k, c in candidates.items() if c.get('identifier')}
+
+    # Every candidate is judged against the preset, not against each other
+    print(f"Judging {len(candidates)} propositions", file=sys.stderr)
+    results = run_batch(client, {
+        custom_id: build_judge_prompt(storage, c['identifier'], c['content'])
+        for custom_id, c in candidates.items()
+    }, poll_interval)
+
+    # Apply in candidate order so the outcome does not depend on result order
+    accepted = []
+    rejected = []
+    for custom_id in sorted(candidates, key=lambda k: int(k.split('-')[1])):
+        c = candidates[custom_id]
+        item = {
+            'identifier': make_unique_identifier(storage, c['identifier']),
+            'content': c['content'],
+            'worth': parse_worth(results.get(custom_id), rng),
+            'created_cycle': 1
+        }
+        if item['worth'] > WORTH_THRESHOLD:
+            storage = storage.with_item(item)
+            accepted.append(item)
+        else:
+            rejected.append(item)
+
+    return {
+        'storage_option': storage_option,
+        'seed': seed,
+        'items': list(storage),
+        'accepted': accepted,
+        'rejected': rejected
+    }
+
+class FakeBatchClient:
+    """Local stand-in for the batch part of the Anthropic client.
+
+    Answers every request with respond(custom_id, prompt) and reports each
+    batch as in progress for the first `polls` retrievals, so runs can be
+    exercised without network access. Requests whose custom_id is in
+    `errored` come back as errored results.
+    """
+
+    def __init__(self, respond=None, polls=1, errored=()):
+        self.respond = respond or fake_response
+        self.polls = polls
+        self.errored = set(errored)
+        self.batches = {}
+        self.messages = SimpleNamespace(batches=self)
+
+    def create(self, requests):
+        batch_id = f"msgbatch_{len(self.batches)}"
+        self.batches[batch_id] = {'requests': requests, 'polls': 0}
+        return self.retrieve(batch_id)
+
+    def retrieve(self, batch_id):
+        batch = self.batches[batch_id]
+        ended = batch['polls'] >= self.polls
+        batch['polls'] += 1
+        return SimpleNamespace(id=batch_id, processing_status="ended" if ended else "in_progress")
+
+    def results(self, batch_id):
+        # Real batches return results in arbitrary order
+        for request in reversed(self.batches[batch_id]['requests']):
+            custom_id = request['custom_id']
+            if custom_id in self.errored:
+                yield SimpleNamespace(custom_id=custom_id, result=SimpleNamespace(type="errored"))
+                continue
+            text = self.respond(custom_id, request['params']['messages'][0]['content'])
+            message = SimpleNamespace(content=[SimpleNamespace(type="text", text=text)])
+            yield SimpleNamespace(custom_id=custom_id,
+                                  result=SimpleNamespace(type="succeeded", message=message))
+
+def fake_response(custom_id, prompt):
+    """Canned answers for FakeBatchClient, depending on the request"""
+    n = int(custom_id.split('-')[1]) + 1
+    if prompt.endswith("Text:"):
+        return f"Offline proposition number {n}."
+    if prompt.endswith("Number:"):
+        # Deliberately repeats numbers to exercise de-duplication
+        return f"9.{n % 5}"
+    return f"An offline grade.\n{n % 7 + 1}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate propositions with the Message Batches API.")
+    parser.add_argument('storage_option', choices=sorted(STORAGE_OPTIONS))
+    parser.add_argument('--candidates', type=int, default=100, help="number of candidates to generate")
+    parser.add_argument('--seed', type=int, default=0, help="seed for partner choice and worth jitter")
+    parser.add_argument('--poll-interval', type=float, default=30, help="seconds between status checks")
+    parser.add_argument('--output', help="write the result as JSON to this file instead of stdout")
+    parser.add_argument('--fake', action='store_true', help="use a local fake batch client (no API calls)")
+    args = parser.parse_args()
+
+    if args.fake:
+        client = FakeBatchClient()
+        args.poll_interval = 0
+    elif GOOGLE_CLOUD_PROJECT:
+        parser.error("batch mode needs the Anthropic API (ANTHROPIC_API_KEY), "
+                     "Vertex AI does not support Message Batches")
+    else:
+        client = get_anthropic_client()
+
+    result = generate(client, args.storage_option, args.candidates, args.seed, args.poll_interval)
+    print(f"Accepted {len(result['accepted'])}, rejected {len(result['rejected'])}", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
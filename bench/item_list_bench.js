@@ -0,0 +1,134 @@
+// Browser-free benchmark of the status update logic in static/item_list.js.
+//
+// Compares the old approach (walk every row on each poll, re-read its
+// identifier and reset all age classes) with ItemListState, which only
+// touches the rows whose highlight or age changed. Rows are stand-in
+// objects with a classList, so this runs under plain Node:
+//
+//     node bench/item_list_bench.js [items] [polls]
+const { ItemListState, applyClasses } = require('../static/item_list.js');
+
+const itemCount = parseInt(process.argv[2]) || 5000;
+const pollCount = parseInt(process.argv[3]) || 1000;
+const windowSize = 40;  // Rows a virtualized list keeps around the viewport
+
+class FakeClassList {
+    constructor() {
+        this.classes = new Set();
+        this.operations = 0;
+    }
+    add(name) { this.operations++; this.classes.add(name); }
+    remove(name) { this.operations++; this.classes.delete(name); }
+    toggle(name, force) { force ? this.add(name) : this.remove(name); }
+}
+
+function makeRow(item) {
+    return { identifier: item.identifier, classList: new FakeClassList(), dataset: {} };
+}
+
+// Ten propositions per cycle, in the order the server returns them
+const items = [];
+for (let i = 0; i < itemCount; i++) {
+    items.push({ identifier: `${i}`, content: `Proposition ${i}`, worth: 50, created_cycle: Math.floor(i / 10) });
+}
+
+// A status poll every 100 ms, with a new cycle every 50 polls
+const statuses = [];
+const lastCycle = Math.floor(itemCount / 10);
+for (let poll = 0; poll < pollCount; poll++) {
+    const cycle = lastCycle - Math.floor(pollCount / 50) + Math.floor(poll / 50);
+    const partner = `${(poll * 7919) % itemCount}`;
+    statuses.push({ highlighted_ids: poll % 50 < 25 ? [`${itemCount - 1}`] : [`${itemCount - 1}`, partner], cycle_count: cycle });
+}
+
+function oldUpdate(rows, data) {
+    rows.forEach(row => {
+        const identifier = row.identifier;
+        if (data.highlighted_ids && data.highlighted_ids.includes(identifier)) {
+            row.classList.add('highlighted');
+        } else {
+            row.classList.remove('highlighted');
+        }
+        const createdCycle = row.createdCycle;
+        const currentCycle = data.cycle_count || 0;
+        for (let i = 0; i <= 5; i++) {
+            row.classList.remove(`age-${i}`);
+        }
+        let ageClass;
+        if (createdCycle === 0) {
+            ageClass = 5;
+        } else {
+            const age = currentCycle - createdCycle;
+            ageClass = age < 0 ? 5 : Math.min(age, 5);
+        }
+        row.classList.add(`age-${ageClass}`);
+    });
+}
+
+function bench(name, run) {
+    const start = process.hrtime.bigint();
+    const operations = run();
+    const elapsed = Number(process.hrtime.bigint() - start) / 1e6;
+    console.log(`${name}: ${(elapsed / pollCount * 1000).toFixed(1)} us/poll, ${(operations / pollCount).toFixed(1)} class changes/poll`);
+}
+
+console.log(`${itemCount} items, ${pollCount} polls`);
+
+bench('full walk', () => {
+    const rows = items.map(item => Object.assign(makeRow(item), { createdCycle: item.created_cycle }));
+    statuses.forEach(data => oldUpdate(rows, data));
+    return rows.reduce((sum, row) => sum + row.classList.operations, 0);
+});
+
+bench('incremental, all rows', () => {
+    const state = new ItemListState();
+    state.setItems(items);
+    const rows = new Map(items.map(item => [item.identifier, makeRow(item)]));
+    rows.forEach((row, id) => applyClasses(row, state, id));
+    const initial = Array.from(rows.values()).reduce((sum, row) => sum + row.classList.operations, 0);
+    statuses.forEach(data => {
+        for (const id of state.applyStatus(data.highlighted_ids, data.cycle_count)) {
+            applyClasses(rows.get(id), state, id);
+        }
+    });
+    return Array.from(rows.values()).reduce((sum, row) => sum + row.classList.operations, 0) - initial;
+});
+
+bench('incremental, windowed', () => {
+    const state = new ItemListState();
+    state.setItems(items);
+    // Rows at the end of the list, where new propositions show up
+    const rows = new Map(items.slice(-windowSize).map(item => [item.identifier, makeRow(item)]));
+    rows.forEach((row, id) => applyClasses(row, state, id));
+    const initial = Array.from(rows.values()).reduce((sum, row) => sum + row.classList.operations, 0);
+    statuses.forEach(data => {
+        for (const id of state.applyStatus(data.highlighted_ids, data.cycle_count)) {
+            const row = rows.get(id);
+            if (row) {
+                applyClasses(row, state, id);
+            }
+        }
+    });
+    return Array.from(rows.values()).reduce((sum, row) => sum + row.classList.operations, 0) - initial;
+});
+
+// Both approaches must end up with the same classes on every row
+const state = new ItemListState();
+state.setItems(items);
+const oldRows = items.map(item => Object.assign(makeRow(item), { createdCycle: item.created_cycle }));
+const newRows = items.map(makeRow);
+newRows.forEach(row => applyClasses(row, state, row.identifier));
+statuses.forEach(data => {
+    oldUpdate(oldRows, data);
+    for (const id of state.applyStatus(data.highlighted_ids, data.cycle_count)) {
+        applyClasses(newRows[parseInt(id)], state, id);
+    }
+});
+for (let i = 0; i < items.length; i++) {
+    const expected = Array.from(oldRows[i].classList.classes).sort().join(' ');
+    const actual = Array.from(newRows[i].classList.classes).sort().join(' ');
+    if (expected !== actual) {
+        throw new Error(`Row ${i}: expected "${expected}", got "${actual}"`);
+    }
+}
+console.log('Incremental classes match the full walk.');
@@ -0,0 +1 @@
+# Lets the tests import app.py and batch.py from the repository root
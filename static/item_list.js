@@ -0,0 +1,301 @@
+// Proposition list for the main page.
+//
+// ItemListState keeps the propositions in memory together with their
+// highlight and age, and works out which of them changed with each status
+// poll. VirtualItemList renders only the rows around the visible part of the
+// page, so the DOM stays the same size however large the corpus gets.
+//
+// The state has no DOM dependencies so it can be benchmarked under Node
+// (see bench/item_list_bench.js).
+(function (exports) {
+    const MAX_AGE = 5;
+
+    function ageFor(createdCycle, currentCycle) {
+        if (createdCycle === 0) {
+            // Initial propositions always stay white
+            return MAX_AGE;
+        }
+        const age = currentCycle - createdCycle;
+        return age < 0 ? MAX_AGE : Math.min(age, MAX_AGE);
+    }
+
+    // Rows are keyed by identifier. Identifiers should be unique, but should
+    // one repeat, its later occurrences get their own key so that every row
+    // is still tracked.
+    function keyFor(identifier, occurrence) {
+        return occurrence === 0 ? identifier : `${identifier}\u0000${occurrence}`;
+    }
+
+    class ItemListState {
+        constructor() {
+            this.items = [];
+            this.keys = [];             // row key of each item
+            this.byKey = new Map();     // row key -> item
+            this.keysById = new Map();  // identifier -> row keys
+            this.byCycle = new Map();   // created_cycle -> row keys
+            this.highlighted = new Set();
+            this.cycle = 0;
+        }
+
+        // Replace the items (sorted, as returned by /get_items). Returns the
+        // row keys that are new or whose data changed.
+        setItems(items) {
+            const changed = [];
+            const keys = [];
+            const byKey = new Map();
+            const keysById = new Map();
+            const byCycle = new Map();
+            for (const item of items) {
+                if (!keysById.has(item.identifier)) {
+                    keysById.set(item.identifier, []);
+                }
+                const idKeys = keysById.get(item.identifier);
+                const key = keyFor(item.identifier, idKeys.length);
+                idKeys.push(key);
+                keys.push(key);
+
+                const old = this.byKey.get(key);
+                if (!old || old.identifier !== item.identifier || old.content !== item.content
+                        || old.worth !== item.worth || old.created_cycle !== item.created_cycle) {
+                    changed.push(key);
+                }
+                byKey.set(key, item);
+
+                const cycle = item.created_cycle || 0;
+                if (!byCycle.has(cycle)) {
+                    byCycle.set(cycle, []);
+                }
+                byCycle.get(cycle).push(key);
+            }
+            this.items = items;
+            this.keys = keys;
+            this.byKey = byKey;
+            this.keysById = keysById;
+            this.byCycle = byCycle;
+            return changed;
+        }
+
+        // Apply a /status response. Returns the row keys whose highlight or
+        // age changed since the previous one.
+        applyStatus(highlightedIds, cycleCount) {
+            const changed = new Set();
+            const addKeys = id => (this.keysById.get(id) || []).forEach(key => changed.add(key));
+
+            const highlighted = new Set(highlightedIds || []);
+            for (const id of this.highlighted) {
+                if (!highlighted.has(id)) addKeys(id);
+            }
+            for (const id of highlighted) {
+                if (!this.highlighted.has(id)) addKeys(id);
+            }
+            this.highlighted = highlighted;
+
+            cycleCount = cycleCount || 0;
+            if (cycleCount !== this.cycle) {
+                // Only items created within MAX_AGE cycles of either count
+                // can have a different age now
+                const low = Math.max(Math.min(this.cycle, cycleCount) - MAX_AGE, 1);
+                const high = Math.max(this.cycle, cycleCount);
+                for (let cycle = low; cycle <= high; cycle++) {
+                    const keys = this.byCycle.get(cycle);
+                    if (keys && ageFor(cycle, this.cycle) !== ageFor(cycle, cycleCount)) {
+                        keys.forEach(key => changed.add(key));
+                    }
+                }
+                this.cycle = cycleCount;
+            }
+
+            return changed;
+        }
+
+        isHighlighted(key) {
+            const item = this.byKey.get(key);
+            return item !== undefined && this.highlighted.has(item.identifier);
+        }
+
+        age(key) {
+            const item = this.byKey.get(key);
+            return ageFor(item ? item.created_cycle || 0 : 0, this.cycle);
+        }
+    }
+
+    // Bring an element's highlight and age classes in line with the state,
+    // touching only the classes that differ
+    function applyClasses(element, state, key) {
+        element.classList.toggle('highlighted', state.isHighlighted(key));
+
+        const age = String(state.age(key));
+        if (element.dataset.age !== age) {
+            if (element.dataset.age !== undefined) {
+                element.classList.remove(`age-${element.dataset.age}`);
+            }
+            element.classList.add(`age-${age}`);
+            element.dataset.age = age;
+        }
+    }
+
+    class VirtualItemList {
+        constructor(listElement, createElement, options = {}) {
+            this.state = new ItemListState();
+            this.createElement = createElement;
+            this.estimatedHeight = options.estimatedHeight || 60;
+            this.overscan = options.overscan || 10;
+
+            this.rows = new Map();      // row key -> element, rendered rows only
+            this.heights = new Map();   // row key -> measured height
+            this.offsets = null;        // top of each row, rebuilt when dirty
+            this.renderScheduled = false;
+
+            this.listElement = listElement;
+            this.topSpacer = document.createElement('div');
+            this.bottomSpacer = document.createElement('div');
+            listElement.append(this.topSpacer, this.bottomSpacer);
+
+            const schedule = () => this.scheduleRender();
+            window.addEventListener('scroll', schedule, { passive: true });
+            window.addEventListener('resize', schedule);
+        }
+
+        get length() {
+            return this.state.items.length;
+        }
+
+        setItems(items) {
+            // Rows whose data changed are recreated on the next render,
+            // except rows being edited
+            for (const key of this.state.setItems(items)) {
+                const row = this.rows.get(key);
+                if (row && !row.classList.contains('edit-mode')) {
+                    row.remove();
+                    this.rows.delete(key);
+                }
+            }
+            // Forget the heights of rows that were deleted or renamed
+            for (const key of this.heights.keys()) {
+                if (!this.state.byKey.has(key)) {
+                    this.heights.delete(key);
+                }
+            }
+            this.offsets = null;
+            this.render();
+        }
+
+        applyStatus(data) {
+            for (const key of this.state.applyStatus(data.highlighted_ids, data.cycle_count)) {
+                const row = this.rows.get(key);
+                if (row) {
+                    applyClasses(row, this.state, key);
+                }
+            }
+        }
+
+        scheduleRender() {
+            if (!this.renderScheduled) {
+                this.renderScheduled = true;
+                requestAnimationFrame(() => {
+                    this.renderScheduled = false;
+                    this.render();
+                });
+            }
+        }
+
+        computeOffsets() {
+            const items = this.state.items;
+            const offsets = new Array(items.length + 1);
+            offsets[0] = 0;
+            for (let i = 0; i < items.length; i++) {
+                const height = this.heights.get(this.state.keys[i]) || this.estimatedHeight;
+                offsets[i + 1] = offsets[i] + height;
+            }
+            return offsets;
+        }
+
+        // Index of the row containing the given offset from the top of the list
+        rowAt(offset) {
+            let low = 0;
+            let high = this.length;
+            while (low < high) {
+                const mid = (low + high) >> 1;
+                if (this.offsets[mid + 1] <= offset) {
+                    low = mid + 1;
+                } else {
+                    high = mid;
+                }
+            }
+            return low;
+        }
+
+        render() {
+            if (!this.offsets) {
+                this.offsets = this.computeOffsets();
+            }
+            const items = this.state.items;
+
+            const listTop = this.listElement.getBoundingClientRect().top + window.scrollY;
+            const viewTop = window.scrollY - listTop;
+            const start = Math.max(this.rowAt(viewTop) - this.overscan, 0);
+            const end = Math.min(this.rowAt(viewTop + window.innerHeight) + 1 + this.overscan, items.length);
+
+            this.topSpacer.style.height = `${this.offsets[start]}px`;
+            this.bottomSpacer.style.height = `${this.offsets[items.length] - this.offsets[end]}px`;
+
+            // Reuse rows that stay in the window, create the rest
+            const rows = new Map();
+            let previous = this.topSpacer;
+            for (let index = start; index < end; index++) {
+                const item = items[index];
+                const key = this.state.keys[index];
+                let row = this.rows.get(key);
+                if (!row) {
+                    row = this.createElement(item, index);
+                }
+                row.dataset.index = index;
+                row.classList.remove('hidden');
+                applyClasses(row, this.state, key);
+                if (previous.nextSibling !== row) {
+                    this.listElement.insertBefore(row, previous.nextSibling);
+                }
+                rows.set(key, row);
+                previous = row;
+            }
+            const windowRows = new Map(rows);
+
+            // Rows being edited outside the window are hidden rather than
+            // removed, so the text typed into them is kept
+            for (const [key, row] of this.rows) {
+                if (rows.has(key)) {
+                    continue;
+                }
+                const index = row.classList.contains('edit-mode') ? this.state.keys.indexOf(key) : -1;
+                if (index === -1) {
+                    row.remove();
+                } else {
+                    row.dataset.index = index;
+                    row.classList.add('hidden');
+                    rows.set(key, row);
+                }
+            }
+            this.rows = rows;
+
+            // Re-render once more if rows turned out taller or shorter than assumed
+            let resized = false;
+            for (const [key, row] of windowRows) {
+                // Rows are spaced with margins, which offsetHeight leaves out
+                const style = getComputedStyle(row);
+                const height = row.offsetHeight + parseFloat(style.marginTop) + parseFloat(style.marginBottom);
+                if (height && this.heights.get(key) !== height) {
+                    this.heights.set(key, height);
+                    resized = true;
+                }
+            }
+            if (resized) {
+                this.offsets = null;
+                this.scheduleRender();
+            }
+        }
+    }
+
+    exports.ItemListState = ItemListState;
+    exports.VirtualItemList = VirtualItemList;
+    exports.applyClasses = applyClasses;
+})(typeof module !== 'undefined' ? module.exports : window);
@@ -0,0 +1,47 @@
+"""Offline checks of batch.generate against FakeBatchClient."""
+import pytest
+
+pytest.importorskip("flask")
+
+from batch import FakeBatchClient, generate
+
+
+def run(**client_options):
+    return generate(FakeBatchClient(**client_options), "tractatus", 12, seed=1, poll_interval=0)
+
+
+def test_generate_is_reproducible():
+    assert run() == run()
+
+
+def test_results_are_mapped_back_by_custom_id():
+    result = run()
+    contents = [item['content'] for item in result['accepted'] + result['rejected']]
+    # Every candidate keeps its own answer although results come back reversed
+    assert sorted(contents) == sorted(f"Offline proposition number {n}." for n in range(1, 13))
+
+
+def test_acceptances_are_applied_in_candidate_order():
+    result = run()
+    numbers = [int(item['content'].split()[-1].rstrip('.')) for item in result['accepted']]
+    assert numbers == sorted(numbers)
+
+    # Repeated numbers get unique identifiers, first come first served
+    identifiers = [item['identifier'] for item in result['items']]
+    assert len(identifiers) == len(set(identifiers))
+    assert identifiers.index('9.2a') == identifiers.index('9.2') + 1
+
+
+def test_errored_results_are_dropped():
+    result = run(errored={"candidate-0", "candidate-5"})
+    contents = [item['content'] for item in result['accepted'] + result['rejected']]
+    assert len(contents) == 10
+    assert "Offline proposition number 1." not in contents
+    assert "Offline proposition number 6." not in contents
+
+
+def test_empty_run_submits_no_batches():
+    client = FakeBatchClient()
+    result = generate(client, "tractatus", 0, poll_interval=0)
+    assert client.batches == {}
+    assert result['accepted'] == []
@@ -0,0 +1,156 @@
+"""Checks of the Corpus snapshots and the routes that publish them."""
+import random
+
+import pytest
+
+pytest.importorskip("flask")
+
+import app
+from app import Corpus, sort_by_identifier
+
+
+def random_item(rng):
+    identifier = '.'.join(str(rng.randint(1, 20)) for _ in range(rng.randint(1, 3)))
+    if rng.random() < 0.2:
+        identifier += rng.choice('ab')
+    return {'identifier': identifier, 'content': f"Proposition {rng.random()}", 'worth': 50}
+
+
+def assert_consistent(corpus):
+    assert list(corpus.items) == sorted(corpus.items, key=sort_by_identifier)
+    assert list(corpus.keys) == [sort_by_identifier(item) for item in corpus.items]
+
+
+def test_random_changes_keep_corpus_sorted():
+    rng = random.Random(0)
+    corpus = Corpus(random_item(rng) for _ in range(50))
+    assert_consistent(corpus)
+    for _ in range(500):
+        choice = rng.random()
+        if choice < 0.4 or not corpus:
+            corpus = corpus.with_item(random_item(rng))
+        elif choice < 0.7:
+            corpus = corpus.without(rng.randrange(len(corpus)))
+        else:
+            corpus = corpus.with_replaced(rng.randrange(len(corpus)), random_item(rng))
+        assert_consistent(corpus)
+
+
+def test_writes_leave_old_snapshots_untouched():
+    rng = random.Random(1)
+    old = Corpus(random_item(rng) for _ in range(20))
+    items = list(old.items)
+    copies = [dict(item) for item in old.items]
+
+    old.with_item(random_item(rng))
+    old.without(3)
+    old.with_replaced(5, dict(old[5], content="Changed"))
+
+    assert list(old.items) == items
+    assert [dict(item) for item in old.items] == copies
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, 'query_claude', lambda prompt: "A reason.\n4")
+    app.sessions.clear()
+    client = app.app.test_client()
+    client.post('/select_storage', json={'storage_option': 'tractatus'})
+    return client
+
+
+def current_storage():
+    (session_data,) = app.sessions.values()
+    return session_data['storage']
+
+
+def test_update_rejects_bad_index(client):
+    before = current_storage()
+    for index in (None, -1, len(before)):
+        response = client.post('/update', json={'index': index, 'identifier': '3', 'content': 'x'})
+        assert response.status_code == 400
+    assert current_storage() is before
+
+
+def test_update_publishes_new_version(client):
+    before = current_storage()
+    response = client.post('/update', json={'index': 0, 'identifier': '3', 'content': 'Moved.'})
+    assert response.status_code == 200
+
+    after = current_storage()
+    assert after is not before
+    assert after[-1]['identifier'] == '3'
+    assert before[0]['identifier'] == '1'
+
+
+def test_update_keeps_identifiers_unique(client):
+    response = client.post('/update', json={'index': 0, 'identifier': '2', 'content': 'Same number.'})
+    assert response.get_json()['identifier'] == '2a'
+
+
+def test_delete_rejects_bad_index(client):
+    before = current_storage()
+    for index in (None, -1, len(before)):
+        assert client.post('/delete', json={'index': index}).status_code == 400
+    assert current_storage() is before
+
+
+def test_delete_publishes_new_version(client):
+    before = current_storage()
+    response = client.post('/delete', json={'index': 0})
+    assert response.status_code == 200
+
+    after = current_storage()
+    assert len(after) == len(before) - 1
+    assert before[0]['identifier'] == '1'
+    assert all(item['identifier'] != '1' for item in after)
+
+
+def test_add_places_duplicate_next_to_its_base(client):
+    response = client.post('/add', json={'identifier': '1.11', 'content': 'Again.'})
+    data = response.get_json()
+    assert data['item']['identifier'] == '1.11a'
+
+    identifiers = [item['identifier'] for item in current_storage()]
+    assert identifiers.index('1.11a') == identifiers.index('1.11') + 1 == data['index']
+
+
+def render_sorted(items):
+    """The sort-and-render the cached rendering replaces"""
+    markdown = ""
+    for item in sorted(items, key=sort_by_identifier):
+        markdown += f"- **{item['identifier']}**: {item['content']}\n"
+    return markdown
+
+
+def test_cached_rendering_matches_sort_and_render():
+    rng = random.Random(2)
+    corpus = Corpus(random_item(rng) for _ in range(50))
+    for _ in range(200):
+        choice = rng.random()
+        if choice < 0.4 or not corpus:
+            corpus = corpus.with_item(random_item(rng))
+        elif choice < 0.7:
+            corpus = corpus.without(rng.randrange(len(corpus)))
+        else:
+            corpus = corpus.with_replaced(rng.randrange(len(corpus)), random_item(rng))
+
+        assert app.format_storage_as_md(corpus) == render_sorted(corpus.items)
+        candidate = random_item(rng)
+        assert app.format_storage_as_md(corpus, candidate) == render_sorted(corpus.items + (candidate,))
+
+
+def test_candidate_with_existing_identifier_goes_after_it():
+    corpus = Corpus([{'identifier': '1', 'content': 'A'}, {'identifier': '2', 'content': 'B'}])
+    candidate = {'identifier': '1', 'content': 'C'}
+    # Same position as a stable sort with the candidate appended
+    assert app.format_storage_as_md(corpus, candidate) == render_sorted(corpus.items + (candidate,))
+    assert app.format_storage_as_md(corpus, candidate).splitlines()[1] == "- **1**: C"
+
+
+def test_candidate_at_the_end():
+    corpus = Corpus([{'identifier': '1', 'content': 'A'}, {'identifier': '2', 'content': 'B'}])
+    candidate = {'identifier': '3', 'content': 'C'}
+    assert app.format_storage_as_md(corpus, candidate) == "- **1**: A\n- **2**: B\n- **3**: C\n"
+    # The cached text of the version itself is unchanged
+    assert app.format_storage_as_md(corpus) == "- **1**: A\n- **2**: B\n"